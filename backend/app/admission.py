@@ -0,0 +1,245 @@
+# backend/app/admission.py
+import ipaddress
+import math
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+
+from app.redis_client import REDIS_URL
+
+load_dotenv()
+
+ProxyNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+# Atomic token bucket. Uses the Redis clock so every worker refills the bucket
+# against the same time source.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class AdmissionStats:
+    """Counts admitted and shed requests per route so operators can see load shedding."""
+    def __init__(self):
+        self.admitted: Dict[str, int] = defaultdict(int)
+        self.shed: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record_admitted(self, route: str):
+        self.admitted[route] += 1
+
+    def record_shed(self, route: str, reason: str):
+        self.shed[route][reason] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "admitted": dict(self.admitted),
+            "shed": {route: dict(reasons) for route, reasons in self.shed.items()},
+        }
+
+
+stats = AdmissionStats()
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the number of in-flight requests for a route in this worker.
+
+    The limit is per process on purpose: what it protects is this worker's
+    share of the DB connection pool and inference capacity.
+    """
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+
+    def try_acquire(self) -> bool:
+        """Takes a slot without waiting. Returns False when the route is saturated."""
+        if self.in_flight >= self.limit:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+
+class TokenBucketLimiter:
+    """
+    Per-client token bucket backed by Redis so all workers share one budget.
+
+    Falls back to an in-process bucket when Redis is not configured or
+    unreachable, so rate limiting degrades instead of failing requests.
+    """
+    def __init__(self, name: str, rate: float, burst: int, redis_url: Optional[str] = REDIS_URL):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._redis = None
+        self._script = None
+        self._local: Dict[str, Tuple[float, float]] = {}
+        if redis_url:
+            try:
+                import redis.asyncio as aioredis
+                # Own client with a tight timeout: a slow Redis must not stall admission
+                self._redis = aioredis.from_url(redis_url, socket_timeout=0.05)
+                self._script = self._redis.register_script(TOKEN_BUCKET_LUA)
+            except ImportError:
+                self._redis = None
+
+    def _take_local(self, client: str) -> Tuple[bool, float]:
+        now = time.monotonic()
+        if len(self._local) > 10_000:
+            # Forget clients whose bucket has refilled; they are indistinguishable from new ones
+            self._local = {
+                c: (t, ts) for c, (t, ts) in self._local.items()
+                if t + (now - ts) * self.rate < self.burst
+            }
+        tokens, ts = self._local.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - ts) * self.rate)
+        if tokens >= 1:
+            self._local[client] = (tokens - 1, now)
+            return True, 0.0
+        self._local[client] = (tokens, now)
+        return False, (1 - tokens) / self.rate
+
+    async def take(self, client: str) -> Tuple[bool, float]:
+        """Consumes one token for `client`. Returns (allowed, retry_after_seconds)."""
+        if self._script is not None:
+            try:
+                allowed, retry_after = await self._script(keys=[f"ratelimit:{self.name}:{client}"], args=[self.rate, self.burst])
+                return bool(int(allowed)), float(retry_after)
+            except Exception:
+                pass  # Redis down: fall through to the local bucket
+        return self._take_local(client)
+
+
+def parse_trusted_proxies(value: str) -> List[ProxyNetwork]:
+    """Parses a comma-separated list of proxy addresses or CIDR ranges."""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip()]
+
+
+def _is_trusted(address: str, trusted_proxies: List[ProxyNetwork]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def client_address(scope, trusted_proxies: List[ProxyNetwork]) -> str:
+    """
+    The address a request comes from. When the peer is one of our proxies
+    (nginx), X-Forwarded-For is walked back from the nearest hop and the first
+    address that isn't a trusted proxy is the caller. Anyone else's
+    X-Forwarded-For is ignored so it can't be spoofed to dodge the limits.
+    """
+    peer = scope["client"][0] if scope.get("client") else "unknown"
+    if not _is_trusted(peer, trusted_proxies):
+        return peer
+    forwarded = ",".join(
+        value.decode("latin-1") for name, value in scope.get("headers", []) if name == b"x-forwarded-for"
+    )
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted_proxies):
+            return hop
+    return hops[0] if hops else peer
+
+
+def retry_after_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+class RateLimitMiddleware:
+    """
+    Applies per-client token buckets to selected routes before FastAPI parses
+    the request, so a rejected multipart upload is never read or buffered.
+    """
+    def __init__(
+        self,
+        app,
+        limits: Dict[Tuple[str, str], TokenBucketLimiter],
+        trusted_proxies: Optional[List[ProxyNetwork]] = None,
+    ):
+        self.app = app
+        self.limits = limits
+        self.trusted_proxies = TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            limiter = self.limits.get((scope["method"], scope["path"]))
+            if limiter is not None:
+                client = client_address(scope, self.trusted_proxies)
+                allowed, retry_after = await limiter.take(client)
+                if not allowed:
+                    stats.record_shed(limiter.name, "rate_limited")
+                    response = JSONResponse(
+                        {"detail": "Too many requests, please retry later"},
+                        status_code=429,
+                        headers=retry_after_header(retry_after),
+                    )
+                    return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+
+def service_unavailable(route: str, reason: str, retry_after: float = 5) -> HTTPException:
+    stats.record_shed(route, reason)
+    return HTTPException(
+        status_code=503,
+        detail="Service is under heavy load, please retry later",
+        headers=retry_after_header(retry_after),
+    )
+
+
+# --- Limits for the hazard endpoints ---
+
+# Proxies whose X-Forwarded-For is believed (e.g. the nginx container)
+TRUSTED_PROXIES = parse_trusted_proxies(os.getenv("TRUSTED_PROXIES", ""))
+
+REPORT_CONCURRENCY = int(os.getenv("REPORT_CONCURRENCY", "8"))
+REPORT_RATE_PER_SECOND = float(os.getenv("REPORT_RATE_PER_SECOND", "0.2"))
+REPORT_BURST = int(os.getenv("REPORT_BURST", "5"))
+# Deferred reports: concurrent inserts per worker, and the backlog size across all workers
+REPORT_PENDING_CONCURRENCY = int(os.getenv("REPORT_PENDING_CONCURRENCY", "4"))
+REPORT_PENDING_MAX = int(os.getenv("REPORT_PENDING_MAX", "1000"))
+
+ANALYTICS_CONCURRENCY = int(os.getenv("ANALYTICS_CONCURRENCY", "4"))
+ANALYTICS_RATE_PER_SECOND = float(os.getenv("ANALYTICS_RATE_PER_SECOND", "2"))
+ANALYTICS_BURST = int(os.getenv("ANALYTICS_BURST", "10"))
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "10"))
+
+report_concurrency = ConcurrencyLimiter("report", REPORT_CONCURRENCY)
+report_rate_limiter = TokenBucketLimiter("report", REPORT_RATE_PER_SECOND, REPORT_BURST)
+report_pending_inserts = ConcurrencyLimiter("report_pending", REPORT_PENDING_CONCURRENCY)
+
+analytics_concurrency = ConcurrencyLimiter("analytics", ANALYTICS_CONCURRENCY)
+analytics_rate_limiter = TokenBucketLimiter("analytics", ANALYTICS_RATE_PER_SECOND, ANALYTICS_BURST)
+
+# (method, path) -> limiter, enforced by RateLimitMiddleware
+RATE_LIMITS = {
+    ("POST", "/api/hazards/report"): report_rate_limiter,
+    ("GET", "/api/hazards/analytics/dashboard"): analytics_rate_limiter,
+}
@@ -0,0 +1,197 @@
+# backend/app/alerts/alert_matcher.py
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from geoalchemy2.shape import to_shape
+from shapely.geometry import Point, Polygon
+from shapely.prepared import prep
+
+EARTH_RADIUS_METERS = 6_371_000
+METERS_PER_DEGREE = 111_320
+
+# Grid cell size in degrees (~5.5 km at the equator). Each subscription is
+# registered in every cell its area touches, so a report only has to look at
+# the subscribers sharing its cell instead of scanning all of them.
+DEFAULT_CELL_SIZE_DEG = 0.05
+
+# Upper bounds keeping a single subscription cheap to index: a 50 km radius
+# spans ~20x20 cells near the equator, a state-sized polygon tens of thousands.
+MAX_RADIUS_METERS = 50_000
+MAX_SUBSCRIPTION_CELLS = 1_000
+
+
+def haversine_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two WGS84 points in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+@dataclass
+class Subscription:
+    """An alert subscription as held by the in-memory index."""
+    id: int
+    user_id: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_meters: float = 0.0
+    polygon: Optional[Polygon] = None
+    hazard_types: FrozenSet[str] = frozenset()
+    min_trust_score: float = 0.0
+    device_token: Optional[str] = None
+    _prepared: object = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.polygon is None and (self.latitude is None or self.longitude is None):
+            raise ValueError("Subscription needs either a point or a polygon")
+        if self.polygon is not None:
+            area = self.polygon
+            if self.radius_meters > 0:
+                # Degree-based buffer; close enough for alert radii of a few km
+                area = area.buffer(self.radius_meters / METERS_PER_DEGREE)
+            self._prepared = prep(area)
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(min_lon, min_lat, max_lon, max_lat) covered by this subscription."""
+        if self.polygon is not None:
+            min_lon, min_lat, max_lon, max_lat = self.polygon.bounds
+            pad = self.radius_meters / METERS_PER_DEGREE
+            return min_lon - pad, min_lat - pad, max_lon + pad, max_lat + pad
+        dlat = self.radius_meters / METERS_PER_DEGREE
+        dlon = self.radius_meters / (METERS_PER_DEGREE * max(math.cos(math.radians(self.latitude)), 0.01))
+        return self.longitude - dlon, self.latitude - dlat, self.longitude + dlon, self.latitude + dlat
+
+    def covers(self, latitude: float, longitude: float) -> bool:
+        if self._prepared is not None:
+            return self._prepared.covers(Point(longitude, latitude))
+        return haversine_meters(self.latitude, self.longitude, latitude, longitude) <= self.radius_meters
+
+    def accepts(self, hazard_type: str, trust_score: float) -> bool:
+        if trust_score < self.min_trust_score:
+            return False
+        return not self.hazard_types or hazard_type in self.hazard_types
+
+
+class AlertMatcher:
+    """
+    Grid-based spatial index over alert subscriptions.
+
+    Matching a report costs a single dict lookup plus an exact check of the
+    subscriptions registered in the report's cell, independent of the total
+    number of subscriptions.
+    """
+    def __init__(self, cell_size_deg: float = DEFAULT_CELL_SIZE_DEG, max_cells: int = MAX_SUBSCRIPTION_CELLS):
+        self.cell_size_deg = cell_size_deg
+        self.max_cells = max_cells
+        self._subscriptions: Dict[int, Subscription] = {}
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (math.floor(longitude / self.cell_size_deg), math.floor(latitude / self.cell_size_deg))
+
+    def _cell_range(self, subscription: Subscription) -> Tuple[int, int, int, int]:
+        min_lon, min_lat, max_lon, max_lat = subscription.bounds()
+        x0, y0 = self._cell(min_lat, min_lon)
+        x1, y1 = self._cell(max_lat, max_lon)
+        return x0, y0, x1, y1
+
+    def _cells_for(self, subscription: Subscription) -> Iterable[Tuple[int, int]]:
+        x0, y0, x1, y1 = self._cell_range(subscription)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield (x, y)
+
+    def cell_count(self, subscription: Subscription) -> int:
+        """Number of grid cells the subscription would be registered in."""
+        x0, y0, x1, y1 = self._cell_range(subscription)
+        return (x1 - x0 + 1) * (y1 - y0 + 1)
+
+    def add(self, subscription: Subscription) -> None:
+        """Registers (or replaces) a subscription in the index."""
+        if self.cell_count(subscription) > self.max_cells:
+            raise ValueError(f"Subscription {subscription.id} covers too large an area")
+        with self._lock:
+            self._remove_locked(subscription.id)
+            self._subscriptions[subscription.id] = subscription
+            for cell in self._cells_for(subscription):
+                self._cells.setdefault(cell, set()).add(subscription.id)
+
+    def remove(self, subscription_id: int) -> None:
+        with self._lock:
+            self._remove_locked(subscription_id)
+
+    def _remove_locked(self, subscription_id: int) -> None:
+        subscription = self._subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return
+        for cell in self._cells_for(subscription):
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(subscription_id)
+                if not members:
+                    del self._cells[cell]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._subscriptions.clear()
+            self._cells.clear()
+
+    def rebuild(self, subscriptions: Iterable[Subscription]) -> List[int]:
+        """
+        Replaces the whole index. The new one is built aside and swapped in,
+        so matching keeps seeing a complete index while a reload runs.
+        Returns the ids of subscriptions skipped for covering too many cells.
+        """
+        fresh = AlertMatcher(self.cell_size_deg, self.max_cells)
+        skipped = []
+        for subscription in subscriptions:
+            try:
+                fresh.add(subscription)
+            except ValueError:
+                skipped.append(subscription.id)
+        with self._lock:
+            self._subscriptions = fresh._subscriptions
+            self._cells = fresh._cells
+        return skipped
+
+    def match(self, latitude: float, longitude: float, hazard_type: str, trust_score: float) -> List[Subscription]:
+        """Returns every subscription whose area, hazard types and trust threshold accept the report."""
+        candidates = self._cells.get(self._cell(latitude, longitude))
+        if not candidates:
+            return []
+        matched = []
+        for subscription_id in tuple(candidates):
+            subscription = self._subscriptions.get(subscription_id)
+            if subscription is None:
+                continue
+            # Cheap attribute checks first, geometry last
+            if subscription.accepts(hazard_type, trust_score) and subscription.covers(latitude, longitude):
+                matched.append(subscription)
+        return matched
+
+
+def subscription_from_model(row) -> Subscription:
+    """Builds an index entry from an AlertSubscription row."""
+    hazard_types = frozenset(t.strip() for t in (row.hazard_types or "").split(",") if t.strip())
+    return Subscription(
+        id=row.id,
+        user_id=row.user_id,
+        latitude=row.latitude,
+        longitude=row.longitude,
+        radius_meters=row.radius_meters or 0.0,
+        polygon=to_shape(row.area) if row.area is not None else None,
+        hazard_types=hazard_types,
+        min_trust_score=row.min_trust_score or 0.0,
+        device_token=row.device_token,
+    )
+
+
+alert_matcher = AlertMatcher()
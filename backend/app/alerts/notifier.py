@@ -0,0 +1,204 @@
+# backend/app/alerts/notifier.py
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Protocol, Tuple
+
+from app.alerts.alert_matcher import Subscription
+from app.redis_client import get_redis
+
+
+@dataclass
+class AlertNotification:
+    user_id: int
+    device_token: Optional[str]
+    report_id: int
+    title: str
+    hazard_type: str
+    trust_score: float
+    latitude: float
+    longitude: float
+
+
+class NotificationSender(Protocol):
+    """Anything that can deliver a batch of notifications (FCM, APNs, Twilio...)."""
+    async def send_batch(self, notifications: List[AlertNotification]) -> None:
+        ...
+
+
+class LogNotificationSender:
+    """Local stub that prints notifications instead of pushing them."""
+    async def send_batch(self, notifications: List[AlertNotification]) -> None:
+        for n in notifications:
+            print(f"🔔 Alert for user {n.user_id}: [{n.hazard_type}] {n.title} (report {n.report_id}, trust {n.trust_score})")
+
+
+class LocalAlertLedger:
+    """
+    In-process record of recent alerts: one per (user, report), at most one
+    per user every `min_interval_seconds`. Used when Redis is not configured.
+    """
+    def __init__(self, min_interval_seconds: float, dedup_capacity: int = 100_000):
+        self.min_interval_seconds = min_interval_seconds
+        self.dedup_capacity = dedup_capacity
+        self._last_sent: "OrderedDict[int, float]" = OrderedDict()
+        self._recent: "OrderedDict[Tuple[int, int], None]" = OrderedDict()
+
+    def _evict(self, now: float):
+        # _last_sent is kept in send order, so expired users sit at the front
+        while self._last_sent:
+            user_id, sent_at = next(iter(self._last_sent.items()))
+            if now - sent_at < self.min_interval_seconds:
+                break
+            self._last_sent.popitem(last=False)
+
+    async def reserve(self, pairs: List[Tuple[int, int]]) -> List[bool]:
+        """Claims each (user_id, report_id); False when it is a duplicate or rate-limited."""
+        now = time.monotonic()
+        self._evict(now)
+        granted = []
+        for user_id, report_id in pairs:
+            key = (user_id, report_id)
+            if key in self._recent or user_id in self._last_sent:
+                granted.append(False)
+                continue
+            self._recent[key] = None
+            self._last_sent[user_id] = now
+            granted.append(True)
+        while len(self._recent) > self.dedup_capacity:
+            self._recent.popitem(last=False)
+        return granted
+
+    async def release(self, pairs: List[Tuple[int, int]]):
+        """Forgets claims whose notifications could not be sent."""
+        for user_id, report_id in pairs:
+            self._recent.pop((user_id, report_id), None)
+            self._last_sent.pop(user_id, None)
+
+
+# Claims a (user, report) alert atomically: skipped if already sent, or if the
+# user was alerted within the interval (the rate key expires on its own).
+RESERVE_ALERT_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if not redis.call('SET', KEYS[2], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return 0
+end
+redis.call('SET', KEYS[1], 1, 'EX', ARGV[3])
+return 1
+"""
+
+
+class RedisAlertLedger:
+    """The same rules as LocalAlertLedger, shared by every worker through Redis."""
+    def __init__(self, redis, min_interval_seconds: float, dedup_ttl_seconds: int = 24 * 3600):
+        self.redis = redis
+        self.min_interval_seconds = min_interval_seconds
+        self.dedup_ttl_seconds = dedup_ttl_seconds
+        self._script = redis.register_script(RESERVE_ALERT_LUA)
+
+    @staticmethod
+    def _keys(user_id: int, report_id: int) -> List[str]:
+        return [f"alerts:sent:{user_id}:{report_id}", f"alerts:rate:{user_id}"]
+
+    async def reserve(self, pairs: List[Tuple[int, int]]) -> List[bool]:
+        interval = max(1, int(self.min_interval_seconds))
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id, report_id in pairs:
+                await self._script(
+                    keys=self._keys(user_id, report_id),
+                    args=[report_id, interval, self.dedup_ttl_seconds],
+                    client=pipe,
+                )
+            results = await pipe.execute()
+        return [bool(int(result)) for result in results]
+
+    async def release(self, pairs: List[Tuple[int, int]]):
+        if pairs:
+            await self.redis.delete(*[key for user_id, report_id in pairs for key in self._keys(user_id, report_id)])
+
+
+class AlertDispatcher:
+    """
+    Turns matched subscriptions into notifications and hands them to the
+    sender in batches.
+
+    A user is notified at most once per report (even when several of their
+    subscriptions match) and at most once every `min_interval_seconds`.
+    Claims on a batch that fails to send are released, so the user isn't
+    muted by an alert they never got.
+    """
+    def __init__(
+        self,
+        sender: NotificationSender,
+        batch_size: int = 500,
+        min_interval_seconds: float = 60.0,
+        dedup_capacity: int = 100_000,
+        redis_getter=None,
+    ):
+        self.sender = sender
+        self.batch_size = batch_size
+        self.min_interval_seconds = min_interval_seconds
+        self.local_ledger = LocalAlertLedger(min_interval_seconds, dedup_capacity)
+        self._redis_getter = redis_getter
+        self._redis_ledger = None
+
+    def _ledger(self):
+        if self._redis_getter is not None and self._redis_ledger is None:
+            redis = self._redis_getter()
+            if redis is not None:
+                self._redis_ledger = RedisAlertLedger(redis, self.min_interval_seconds)
+        return self._redis_ledger or self.local_ledger
+
+    async def _reserve(self, pairs: List[Tuple[int, int]]):
+        ledger = self._ledger()
+        try:
+            return ledger, await ledger.reserve(pairs)
+        except Exception as e:
+            if ledger is self.local_ledger:
+                raise
+            print(f"❌ Alert ledger unavailable in Redis, using this worker's: {e}")
+            return self.local_ledger, await self.local_ledger.reserve(pairs)
+
+    async def dispatch(self, report, subscriptions: Iterable[Subscription]) -> int:
+        """Sends alerts for `report` to the matched subscribers. Returns how many were sent."""
+        # One notification per user, whichever of their subscriptions matched
+        by_user = {}
+        for subscription in subscriptions:
+            by_user.setdefault(subscription.user_id, subscription)
+        if not by_user:
+            return 0
+
+        users = list(by_user)
+        ledger, granted = await self._reserve([(user_id, report.id) for user_id in users])
+        notifications = [
+            AlertNotification(
+                user_id=user_id,
+                device_token=by_user[user_id].device_token,
+                report_id=report.id,
+                title=report.title,
+                hazard_type=report.hazard_type,
+                trust_score=report.trust_score,
+                latitude=report.latitude,
+                longitude=report.longitude,
+            )
+            for user_id, ok in zip(users, granted) if ok
+        ]
+
+        sent = 0
+        for start in range(0, len(notifications), self.batch_size):
+            batch = notifications[start:start + self.batch_size]
+            try:
+                await self.sender.send_batch(batch)
+                sent += len(batch)
+            except Exception as e:
+                print(f"❌ Failed to send {len(batch)} alerts for report {report.id}: {e}")
+                try:
+                    await ledger.release([(n.user_id, n.report_id) for n in batch])
+                except Exception as release_error:
+                    print(f"❌ Could not release alert claims: {release_error}")
+        return sent
+
+
+alert_dispatcher = AlertDispatcher(LogNotificationSender(), redis_getter=get_redis)
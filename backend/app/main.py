@@ -5,15 +5,24 @@ import uvicorn
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from routes import hazards
+from routes import hazards, alerts
 from app import websocket_handler
+from app.database import SessionLocal
+from sqlalchemy.exc import SQLAlchemyError
+from app import admission
+from app.serialization import NegotiatedResponse, ContentNegotiationMiddleware
+import asyncio
+from fastapi.concurrency import run_in_threadpool
 app = FastAPI(
     title="Synapse Hazard Intelligence API",
     description="AI-powered disaster reporting and analysis platform",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=NegotiatedResponse
 )
 app.include_router(hazards.router)
 app.include_router(websocket_handler.router)
+# Rate limits run inside CORS so 429s still carry CORS headers
+app.add_middleware(admission.RateLimitMiddleware, limits=admission.RATE_LIMITS)
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -22,11 +31,32 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Lets clients ask for MessagePack instead of JSON via the Accept header
+app.add_middleware(ContentNegotiationMiddleware)
 
 # Include routers
 app.include_router(hazards.router)
+app.include_router(alerts.router)
 app.include_router(websocket_handler.router)
 
+@app.on_event("startup")
+async def load_alert_subscriptions():
+    db = SessionLocal()
+    try:
+        count = alerts.load_subscriptions(db)
+        print(f"Loaded {count} alert subscriptions into the geofence index.")
+    except SQLAlchemyError as e:
+        # e.g. alert_subscriptions not created yet: run create_tables.py; the API still serves reports
+        print(f"❌ Could not load alert subscriptions, starting with an empty alert index: {e}")
+    finally:
+        db.close()
+    app.state.subscription_sync_task = asyncio.create_task(alerts.subscription_sync_listener())
+
+@app.on_event("startup")
+async def start_deferred_scoring():
+    # Keep a reference so the task is not garbage collected
+    app.state.deferred_scoring_task = asyncio.create_task(hazards.deferred_scoring_worker())
+
 @app.get("/")
 async def root():
     return {"message": "Synapse API is running", "status": "healthy"}
@@ -35,5 +65,21 @@ async def root():
 async def health_check():
     return {"status": "ok", "service": "synapse-api"}
 
+@app.get("/health/admission")
+async def admission_status():
+    """Load-shedding counters and current pressure for operators."""
+    try:
+        pending = await run_in_threadpool(hazards.count_pending_reports)
+    except SQLAlchemyError:
+        pending = None
+    return {
+        **admission.stats.snapshot(),
+        "in_flight": {
+            "report": admission.report_concurrency.in_flight,
+            "analytics": admission.analytics_concurrency.in_flight,
+        },
+        "deferred_reports_pending": pending,
+    }
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
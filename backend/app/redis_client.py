@@ -0,0 +1,24 @@
+# backend/app/redis_client.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+_client = None
+
+
+def get_redis():
+    """
+    Returns the shared asyncio Redis client, or None when Redis is not
+    configured so callers can fall back to per-process behaviour.
+    """
+    global _client
+    if _client is None and REDIS_URL:
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            return None
+        _client = aioredis.from_url(REDIS_URL)
+    return _client
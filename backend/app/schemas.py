@@ -0,0 +1,33 @@
+# backend/app/schemas.py
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from models.hazard import HazardReport
+
+
+class HazardReportResponse(BaseModel):
+    """Lean report representation: no geometry blob, one (timezone-aware) timestamp."""
+    id: int
+    title: str
+    description: Optional[str] = None
+    hazard_type: str
+    severity_score: Optional[float] = None
+    trust_score: Optional[float] = None
+    report_source: Optional[str] = None
+    latitude: float
+    longitude: float
+    address: Optional[str] = None
+    image_url: Optional[str] = None
+    is_verified: bool
+    scoring_status: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+
+REPORT_FIELDS = tuple(HazardReportResponse.model_fields)
+
+
+def hazard_report_payload(report: HazardReport) -> dict:
+    """Builds the HazardReportResponse fields straight from the ORM object, skipping validation."""
+    return {name: getattr(report, name) for name in REPORT_FIELDS}
@@ -0,0 +1,119 @@
+# backend/app/serialization.py
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; everyone gets JSON without it
+    msgpack = None
+
+MSGPACK_AVAILABLE = msgpack is not None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Encoding negotiated for the current request, set by ContentNegotiationMiddleware
+_response_encoding: ContextVar[str] = ContextVar("response_encoding", default="json")
+
+
+def _fallback(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _accept_quality(accept: str, media_type: str, explicit_only: bool = False) -> float:
+    """q-value the Accept header gives `media_type`, using the most specific matching range."""
+    main_type = media_type.split("/")[0]
+    best_specificity, quality = -1, 0.0
+    for media_range in accept.split(","):
+        name, *params = [part.strip() for part in media_range.split(";")]
+        name = name.lower()
+        if name == media_type:
+            specificity = 2
+        elif explicit_only:
+            continue
+        elif name == f"{main_type}/*":
+            specificity = 1
+        elif name == "*/*":
+            specificity = 0
+        else:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if specificity > best_specificity:
+            best_specificity, quality = specificity, q
+    return quality
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """
+    True when the Accept header names MessagePack with a q-value at least as
+    high as JSON's (and we can produce it). `q=0` excludes a type, and
+    wildcards alone never switch a client away from JSON.
+    """
+    if not MSGPACK_AVAILABLE or not accept:
+        return False
+    msgpack_q = max(_accept_quality(accept, media_type, explicit_only=True) for media_type in MSGPACK_MEDIA_TYPES)
+    return msgpack_q > 0 and msgpack_q >= _accept_quality(accept, "application/json")
+
+
+def dumps_json(data: Any) -> bytes:
+    return orjson.dumps(data, default=_fallback, option=ORJSON_OPTIONS)
+
+
+def dumps_msgpack(data: Any) -> bytes:
+    return msgpack.packb(data, default=_fallback, use_bin_type=True)
+
+
+def encode(data: Any, encoding: str) -> bytes:
+    return dumps_msgpack(data) if encoding == "msgpack" else dumps_json(data)
+
+
+class NegotiatedResponse(ORJSONResponse):
+    """
+    Default API response: orjson, or MessagePack when the client asked for it
+    with `Accept: application/msgpack`.
+    """
+    def render(self, content: Any) -> bytes:
+        if _response_encoding.get() == "msgpack":
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return dumps_msgpack(content)
+        return dumps_json(content)
+
+    def init_headers(self, headers=None) -> None:
+        super().init_headers(headers)
+        if MSGPACK_AVAILABLE:
+            self.raw_headers.append((b"vary", b"Accept"))
+
+
+class ContentNegotiationMiddleware:
+    """Reads the Accept header once per HTTP request so NegotiatedResponse can pick an encoding."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = None
+        for name, value in scope["headers"]:
+            if name == b"accept":
+                accept = value.decode("latin-1")
+                break
+        token = _response_encoding.set("msgpack" if wants_msgpack(accept) else "json")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _response_encoding.reset(token)
@@ -1,28 +1,42 @@
 # backend/app/routes/websockets.py
-import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
+from typing import Dict
+
+from app.serialization import MSGPACK_AVAILABLE, encode, wants_msgpack
 
 router = APIRouter()
 
 class ConnectionManager:
     """Manages active WebSocket connections."""
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        # Each connection maps to the encoding it negotiated: "json" or "msgpack"
+        self.active_connections: Dict[WebSocket, str] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        # Browsers can't set Accept on a WebSocket, so ?encoding=msgpack works too
+        if wants_msgpack(websocket.headers.get("accept")) or (
+            websocket.query_params.get("encoding") == "msgpack" and MSGPACK_AVAILABLE
+        ):
+            self.active_connections[websocket] = "msgpack"
+        else:
+            self.active_connections[websocket] = "json"
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.active_connections.pop(websocket, None)
 
     async def broadcast_json(self, data: dict):
-        """Broadcasts a JSON message to all connected clients."""
-        # Convert SQLAlchemy model to a JSON-serializable dictionary
-        message = json.dumps(data, default=str) # default=str handles datetime objects
-        for connection in self.active_connections:
-            await connection.send_text(message)
+        """Broadcasts a message to all connected clients in their negotiated encoding."""
+        # Encode once per encoding, not once per client
+        messages = {}
+        for connection, encoding in list(self.active_connections.items()):
+            if encoding not in messages:
+                payload = encode(data, encoding)
+                messages[encoding] = payload if encoding == "msgpack" else payload.decode()
+            if encoding == "msgpack":
+                await connection.send_bytes(messages[encoding])
+            else:
+                await connection.send_text(messages[encoding])
 
 manager = ConnectionManager()
 
@@ -1,7 +1,22 @@
 # create_tables.py
+from sqlalchemy import inspect, text
+
 from app.database import engine
 from models.hazard import Base # Import Base from your models file
 
 print("Creating database tables...")
 Base.metadata.create_all(bind=engine)
-print("Tables created successfully.")
\ No newline at end of file
+print("Tables created successfully.")
+
+# create_all doesn't touch existing tables: add columns introduced since they were created
+existing_columns = {column["name"] for column in inspect(engine).get_columns("hazard_reports")}
+if "scoring_status" not in existing_columns:
+    print("Adding hazard_reports.scoring_status...")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "ALTER TABLE hazard_reports ADD COLUMN scoring_status VARCHAR(20) DEFAULT 'scored'"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_hazard_reports_scoring_status ON hazard_reports (scoring_status)"
+        ))
+    print("Migration applied.")
@@ -14,6 +14,8 @@ class HazardReport(Base):
     hazard_type = Column(String(50), nullable=False)
     severity_score = Column(Float, default=0.5)
     trust_score = Column(Float, default=0.3)
+    # 'pending' while a report accepted under load waits for deferred scoring
+    scoring_status = Column(String(20), default='scored', index=True)
     report_source = Column(String, default='citizen_app')
     location = Column(Geometry('POINT'))
     latitude = Column(Float)
@@ -36,4 +38,19 @@ class SocialMediaPost(Base):
     sentiment_score = Column(Float)
     hazard_keywords = Column(String(500))
     location_extracted = Column(String(200))
-    created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, server_default=func.now())
+
+class AlertSubscription(Base):
+    __tablename__ = "alert_subscriptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    device_token = Column(String(500))  # Push target handed to the notification sender
+    # A subscription is either a point + radius or a polygon (optionally widened by radius_meters)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    area = Column(Geometry('POLYGON', srid=4326), nullable=True)
+    radius_meters = Column(Float, default=0)
+    hazard_types = Column(String(500))  # Comma-separated, empty means all types
+    min_trust_score = Column(Float, default=0.5)
+    created_at = Column(DateTime, server_default=func.now())
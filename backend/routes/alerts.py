@@ -0,0 +1,191 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
+from pydantic import BaseModel, Field
+import asyncio
+from sqlalchemy.orm import Session
+from app.database import get_db, SessionLocal
+from models.hazard import AlertSubscription
+from geoalchemy2.shape import from_shape
+from shapely.geometry import Polygon
+
+from app.alerts.alert_matcher import alert_matcher, subscription_from_model, MAX_RADIUS_METERS
+from app.alerts.notifier import alert_dispatcher
+from app.redis_client import get_redis
+
+router = APIRouter(prefix="/api/alerts", tags=["alerts"])
+
+# Every worker keeps its own index; changes are announced here so the others follow
+SUBSCRIPTION_CHANNEL = "alerts:subscriptions"
+
+DEFAULT_POINT_RADIUS_METERS = 1000
+
+
+class AlertSubscriptionCreate(BaseModel):
+    user_id: int
+    device_token: Optional[str] = None
+    # Either a point (latitude/longitude + radius) or a polygon of [longitude, latitude] pairs
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    polygon: Optional[List[List[float]]] = None
+    # Defaults to 1 km around a point; a polygon is not widened unless asked
+    radius_meters: Optional[float] = Field(None, ge=0, le=MAX_RADIUS_METERS)
+    hazard_types: List[str] = []
+    min_trust_score: float = Field(0.5, ge=0, le=1)
+
+
+def load_subscriptions(db: Session) -> int:
+    """Rebuilds the in-memory alert index from the database."""
+    skipped = alert_matcher.rebuild(
+        subscription_from_model(row) for row in db.query(AlertSubscription).yield_per(10_000)
+    )
+    if skipped:
+        print(f"⚠️ Skipped {len(skipped)} alert subscriptions covering too large an area: {skipped[:10]}")
+    return len(alert_matcher)
+
+
+def _reload_all():
+    db = SessionLocal()
+    try:
+        return load_subscriptions(db)
+    finally:
+        db.close()
+
+
+def _reload_one(subscription_id: int):
+    db = SessionLocal()
+    try:
+        row = db.query(AlertSubscription).filter(AlertSubscription.id == subscription_id).first()
+        if row is None:
+            alert_matcher.remove(subscription_id)
+        else:
+            alert_matcher.add(subscription_from_model(row))
+    finally:
+        db.close()
+
+
+def _save_subscription(db: Session, row: AlertSubscription):
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+
+
+def _delete_subscription(db: Session, subscription_id: int) -> bool:
+    row = db.query(AlertSubscription).filter(AlertSubscription.id == subscription_id).first()
+    if row is None:
+        return False
+    db.delete(row)
+    db.commit()
+    return True
+
+
+async def publish_subscription_change(action: str, subscription_id: int):
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.publish(SUBSCRIPTION_CHANNEL, f"{action}:{subscription_id}")
+    except Exception as e:
+        print(f"❌ Could not publish alert subscription change: {e}")
+
+
+async def subscription_sync_listener():
+    """Applies subscription changes made on other workers to this worker's index."""
+    redis = get_redis()
+    if redis is None:
+        print("⚠️ REDIS_URL not set: alert subscriptions only reach other workers on restart.")
+        return
+    connected_before = False
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(SUBSCRIPTION_CHANNEL)
+            if connected_before:
+                # Changes published while we were disconnected are gone; resync from the database
+                await run_in_threadpool(_reload_all)
+            connected_before = True
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                action, _, subscription_id = message["data"].decode().partition(":")
+                if action == "remove":
+                    alert_matcher.remove(int(subscription_id))
+                else:
+                    await run_in_threadpool(_reload_one, int(subscription_id))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Alert subscription sync interrupted: {e}")
+            await asyncio.sleep(5)
+        finally:
+            # Each reconnect opens a new connection; don't leak the old one
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+async def notify_subscribers(report) -> int:
+    """Matches a freshly scored report against the alert index and dispatches notifications."""
+    if report.latitude is None or report.longitude is None:
+        return 0
+    matched = alert_matcher.match(report.latitude, report.longitude, report.hazard_type, report.trust_score)
+    if not matched:
+        return 0
+    return await alert_dispatcher.dispatch(report, matched)
+
+
+@router.post("/subscriptions", response_model=dict, status_code=201)
+async def create_subscription(subscription: AlertSubscriptionCreate, db: Session = Depends(get_db)):
+    if subscription.polygon is None and (subscription.latitude is None or subscription.longitude is None):
+        raise HTTPException(status_code=400, detail="Provide either latitude/longitude or a polygon")
+    if subscription.polygon is None and subscription.radius_meters == 0:
+        raise HTTPException(status_code=400, detail="A point subscription needs a radius_meters above 0")
+
+    radius_meters = subscription.radius_meters
+    if radius_meters is None:
+        radius_meters = 0 if subscription.polygon is not None else DEFAULT_POINT_RADIUS_METERS
+
+    area = None
+    if subscription.polygon is not None:
+        try:
+            polygon = Polygon(subscription.polygon)
+        except ValueError:
+            polygon = None
+        if polygon is None or not polygon.is_valid:
+            raise HTTPException(status_code=400, detail="Invalid polygon")
+        min_lon, min_lat, max_lon, max_lat = polygon.bounds
+        if min_lon < -180 or max_lon > 180 or min_lat < -90 or max_lat > 90:
+            raise HTTPException(status_code=400, detail="Polygon coordinates out of range")
+        area = from_shape(polygon, srid=4326)
+
+    row = AlertSubscription(
+        user_id=subscription.user_id,
+        device_token=subscription.device_token,
+        latitude=subscription.latitude,
+        longitude=subscription.longitude,
+        area=area,
+        radius_meters=radius_meters,
+        hazard_types=",".join(subscription.hazard_types),
+        min_trust_score=subscription.min_trust_score,
+    )
+    # Check the footprint before touching the database
+    indexed = subscription_from_model(row)
+    if alert_matcher.cell_count(indexed) > alert_matcher.max_cells:
+        raise HTTPException(status_code=400, detail="Subscription area is too large")
+
+    await run_in_threadpool(_save_subscription, db, row)
+    indexed.id = row.id
+    alert_matcher.add(indexed)
+    await publish_subscription_change("add", row.id)
+
+    return {"success": True, "subscription_id": row.id}
+
+
+@router.delete("/subscriptions/{subscription_id}")
+async def delete_subscription(subscription_id: int, db: Session = Depends(get_db)):
+    if not await run_in_threadpool(_delete_subscription, db, subscription_id):
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    alert_matcher.remove(subscription_id)
+    await publish_subscription_change("remove", subscription_id)
+    return {"success": True}
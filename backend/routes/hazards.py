@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File,Form
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File,Form, BackgroundTasks, Response
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 from pydantic import BaseModel
 import asyncio
+import time
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from models.hazard import HazardReport
 from geoalchemy2.shape import from_shape
 from shapely.geometry import Point
@@ -13,9 +15,28 @@ from sqlalchemy import func, case
 
 from app.ai import text_analyser, image_analyser
 from app.websocket_handler import manager as websocket_manager
+from app.serialization import NegotiatedResponse
+from app.schemas import HazardReportResponse, hazard_report_payload
+from routes.alerts import notify_subscribers
+from app.admission import (
+    stats as admission_stats, service_unavailable,
+    report_concurrency, report_pending_inserts, REPORT_PENDING_MAX,
+    analytics_concurrency, ANALYTICS_CACHE_TTL,
+)
+from app.redis_client import get_redis
 
 router = APIRouter(prefix="/api/hazards", tags=["hazards"])
 
+# Reports accepted under load are stored with scoring_status='pending' and
+# scored later by deferred_scoring_worker. Their images wait in Redis until
+# then, or in this process when Redis isn't configured (single worker only).
+PENDING_IMAGES_TTL_SECONDS = 24 * 3600
+DEFERRED_POLL_SECONDS = 1.0
+_local_pending_images = {}
+
+# Last computed dashboard analytics, served while fresh or when the route is shedding load
+_analytics_cache = {"data": None, "computed_at": 0.0}
+
 
 def calculate_final_trust_score(text_score: float, image_score: float) -> int:
     """Combine scores with weighting."""
@@ -35,21 +56,190 @@ class HazardReportCreate(BaseModel):
     address: Optional[str] = None
     media_urls: Optional[List[str]] = []
 
-class HazardReportResponse(BaseModel):
-    id: int
-    title: str
-    description: str
-    hazard_type: str
-    severity_score: float
-    trust_score: float
-    latitude: float
-    longitude: float
-    address: str
-    is_verified: bool
-    created_at: str
 
-@router.post("/report", response_model=dict,status_code=201)
+def _score_report(description: str, image_contents: List[bytes]) -> float:
+    text_score = text_analyser.analyze_report_text(description)
+    image_score = 0.0
+    if image_contents:
+        image_scores = [image_analyser.analyze_report_image(content) for content in image_contents]
+        image_score = sum(image_scores) / len(image_scores)
+    return calculate_final_trust_score(text_score, image_score)
+
+
+def _new_report(fields: dict, **extra) -> HazardReport:
+    # ... logic to upload images to a cloud service ...
+    return HazardReport(
+        **fields,
+        location=from_shape(Point(fields["longitude"], fields["latitude"]), srid=4326), # Save the geospatial point
+        # severity_score can be calculated later or set to a default
+        # image_url would be set here after uploading
+        **extra,
+    )
+
+
+def _store_scored_report(db: Session, fields: dict, image_contents: List[bytes]) -> HazardReport:
+    new_report = _new_report(fields, trust_score=_score_report(fields["description"], image_contents))
+    db.add(new_report)
+    db.commit()
+    db.refresh(new_report)
+    return new_report
+
+
+def _insert_pending_report(db: Session, fields: dict) -> HazardReport:
+    # Flushed, not committed: the id is assigned but no worker can see the row yet
+    new_report = _new_report(fields, trust_score=None, scoring_status="pending")
+    db.add(new_report)
+    db.flush()
+    return new_report
+
+
+def _commit_report(db: Session, report: HazardReport):
+    db.commit()
+    db.refresh(report)
+
+
+def _claim_pending_report(db: Session) -> Optional[HazardReport]:
+    # The row lock is held until commit, so two workers never score the same report
+    return (
+        db.query(HazardReport)
+        .filter(HazardReport.scoring_status == "pending")
+        .order_by(HazardReport.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+
+
+def _finish_pending_report(db: Session, report: HazardReport, trust_score: Optional[float], status: str):
+    report.trust_score = trust_score
+    report.scoring_status = status
+    db.commit()
+    db.refresh(report)
+
+
+def _count_pending_reports(db: Session) -> int:
+    return db.query(HazardReport).filter(HazardReport.scoring_status == "pending").count()
+
+
+def _pending_images_key(report_id: int) -> str:
+    return f"deferred:report_images:{report_id}"
+
+
+async def stash_pending_images(report_id: int, image_contents: List[bytes]):
+    """Stores a deferred report's images. Raises if Redis is configured but fails,
+    since images kept in this process would be invisible to the other workers."""
+    if not image_contents:
+        return
+    redis = get_redis()
+    if redis is None:
+        _local_pending_images[report_id] = image_contents
+        return
+    key = _pending_images_key(report_id)
+    await redis.rpush(key, *image_contents)
+    await redis.expire(key, PENDING_IMAGES_TTL_SECONDS)
+
+
+async def load_pending_images(report_id: int) -> List[bytes]:
+    redis = get_redis()
+    if redis is None:
+        return _local_pending_images.get(report_id, [])
+    return await redis.lrange(_pending_images_key(report_id), 0, -1)
+
+
+async def discard_pending_images(report_id: int):
+    _local_pending_images.pop(report_id, None)
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.delete(_pending_images_key(report_id))
+    except Exception as e:
+        # Not fatal: the key expires after PENDING_IMAGES_TTL_SECONDS anyway
+        print(f"⚠️ Could not discard images of report {report_id}: {e}")
+
+
+async def store_pending_report(db: Session, fields: dict, image_contents: List[bytes]) -> HazardReport:
+    """
+    Saves a report for deferred scoring. The images are stored before the row
+    is committed, so a worker can never claim the report without them.
+    """
+    report = await run_in_threadpool(_insert_pending_report, db, fields)
+    try:
+        await stash_pending_images(report.id, image_contents)
+        await run_in_threadpool(_commit_report, db, report)
+    except Exception:
+        db.rollback()
+        await discard_pending_images(report.id)
+        raise
+    return report
+
+
+async def score_and_store_report(db: Session, fields: dict, image_contents: List[bytes]) -> HazardReport:
+    """Scores a report with the AI models, saves it and broadcasts it to the dashboard."""
+    # Inference and the DB write are blocking; keep them off the event loop
+    new_report = await run_in_threadpool(_store_scored_report, db, fields, image_contents)
+    await websocket_manager.broadcast_json(hazard_report_payload(new_report))
+    return new_report
+
+
+async def score_next_pending_report() -> Optional[int]:
+    """
+    Claims and scores the oldest pending report. Returns its id, or None when
+    there was nothing to score or Redis/the database failed (the report then
+    stays pending and is retried).
+    """
+    db = SessionLocal()
+    report_id = None
+    try:
+        report = await run_in_threadpool(_claim_pending_report, db)
+        if report is None:
+            return None
+        report_id = report.id
+        image_contents = await load_pending_images(report_id)
+        try:
+            trust_score = await run_in_threadpool(_score_report, report.description, image_contents)
+        except Exception as e:
+            # The models can't handle this report; retrying would only fail again ahead of the others
+            print(f"❌ Scoring of deferred report {report_id} failed: {e}")
+            await run_in_threadpool(_finish_pending_report, db, report, None, "failed")
+            await discard_pending_images(report_id)
+            return report_id
+        await run_in_threadpool(_finish_pending_report, db, report, trust_score, "scored")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Deferred scoring of report {report_id} interrupted, will retry: {e}")
+        return None
+    finally:
+        db.close()
+
+    await discard_pending_images(report_id)
+    await websocket_manager.broadcast_json(hazard_report_payload(report))
+    await notify_subscribers(report)
+    return report_id
+
+
+async def deferred_scoring_worker():
+    """Scores pending reports whenever the report route has spare capacity."""
+    while True:
+        # Live requests take priority; only use a slot when one is free
+        if not report_concurrency.try_acquire():
+            await asyncio.sleep(DEFERRED_POLL_SECONDS)
+            continue
+        try:
+            report_id = await score_next_pending_report()
+        except Exception as e:
+            # Scored and saved, but broadcasting or alerting failed
+            print(f"❌ Deferred scoring worker error: {e}")
+            report_id = None
+        finally:
+            report_concurrency.release()
+        if report_id is None:
+            await asyncio.sleep(DEFERRED_POLL_SECONDS)
+
+
+@router.post("/report", response_model=dict, status_code=201)
 async def create_hazard_report(
+    background_tasks: BackgroundTasks,
+    response: Response,
     # Use Form for multipart data
     title: str = Form(...),
     description: str = Form(...),
@@ -60,60 +250,61 @@ async def create_hazard_report(
     images: List[UploadFile] = File(None),
     db: Session = Depends(get_db)
 ):
+    # Rate limiting happens in RateLimitMiddleware, before the upload is parsed
+    if images and len(images) > 3:
+        raise HTTPException(status_code=400, detail="Maximum 3 images allowed")
+
+    fields = {
+        "title": title,
+        "description": description,
+        "hazard_type": hazard_type,
+        "latitude": latitude,
+        "longitude": longitude,
+        "address": address,
+    }
+    image_contents = [await image.read() for image in images] if images else []
+
+    if not report_concurrency.try_acquire():
+        # Scoring is saturated: persist the report as pending and score it later
+        # instead of piling up requests that each hold a thread and DB connection.
+        # The backlog itself is bounded too; past that, callers are told to come back.
+        if not report_pending_inserts.try_acquire():
+            raise service_unavailable("report", "pending_inserts")
+        try:
+            if await run_in_threadpool(_count_pending_reports, db) >= REPORT_PENDING_MAX:
+                raise service_unavailable("report", "pending_full")
+            pending = await store_pending_report(db, fields, image_contents)
+        except HTTPException:
+            raise
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Could not store deferred report: {e}")
+            raise service_unavailable("report", "store_failed")
+        finally:
+            report_pending_inserts.release()
+        admission_stats.record_shed("report", "deferred")
+        response.status_code = 202
+        return {
+            "success": True,
+            "message": "Hazard report queued for scoring",
+            "report_id": pending.id,
+            "scoring_status": pending.scoring_status,
+        }
+
+    admission_stats.record_admitted("report")
     try:
-        if images and len(images) > 3:
-            raise HTTPException(status_code=400, detail="Maximum 3 images allowed")
-
-
-        text_score = text_analyser.analyze_report_text(description)
-        image_score = 0.0
-        if images:
-            image_scores = []
-            for image in images:
-                image_content = await image.read()
-                # It's important to seek back to the start if you need to read the file again
-                image.file.seek(0) 
-                score = image_analyser.analyze_report_image(image_content)
-                image_scores.append(score)
-            
-            if image_scores:
-                image_score = sum(image_scores) / len(image_scores)
-
-        trust_score = calculate_final_trust_score(text_score, image_score)
+        new_report = await score_and_store_report(db, fields, image_contents)
+        # Push alerts to geofenced subscribers after the response is sent
+        background_tasks.add_task(notify_subscribers, new_report)
 
-    # ... logic to upload images to a cloud service ...
-        
-
-        location_point = from_shape(Point(longitude, latitude), srid=4326)
-
-        new_report = HazardReport(
-            title=title,
-            description=description,
-            hazard_type=hazard_type,
-            latitude=latitude,
-            longitude=longitude,
-            address=address,
-            location=location_point, # Save the geospatial point
-            trust_score=trust_score,
-            # severity_score can be calculated later or set to a default
-            # image_url would be set here after uploading
-            
-        )
-        
-        db.add(new_report)
-        db.commit()
-        db.refresh(new_report)
-        report_dict = {c.name: getattr(new_report, c.name) for c in new_report.__table__.columns}
-        await websocket_manager.broadcast_json(report_dict)
-        
     # # Mock trust score calculation
     # trust_score = 0.7 if "flood" in report.description.lower() else 0.5
-    
+
         return {
             "success": True,
             "message": "Hazard report created successfully",
-            "report_id": 12345,
-            "trust_score": trust_score,
+            "report_id": new_report.id,
+            "trust_score": new_report.trust_score,
             #"estimated_severity": 0.6
         }
     except Exception as e:
@@ -122,6 +313,29 @@ async def create_hazard_report(
             status_code=500,
             detail=f"Error processing report: {str(e)}"
         )
+    finally:
+        report_concurrency.release()
+
+
+def count_pending_reports() -> int:
+    db = SessionLocal()
+    try:
+        return _count_pending_reports(db)
+    finally:
+        db.close()
+
+
+def _get_report(db: Session, report_id: int) -> Optional[HazardReport]:
+    return db.query(HazardReport).filter(HazardReport.id == report_id).first()
+
+
+@router.get("/report/{report_id}", response_model=HazardReportResponse)
+async def get_hazard_report(report_id: int, db: Session = Depends(get_db)):
+    """Looks up a report, e.g. to follow a deferred one until it is scored."""
+    report = await run_in_threadpool(_get_report, db, report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return NegotiatedResponse(hazard_report_payload(report))
 
 @router.get("/nearby")
 async def get_nearby_hazards(lat: float, lon: float, radius: int = 5000):
@@ -151,10 +365,9 @@ async def get_nearby_hazards(lat: float, lon: float, radius: int = 5000):
     
     return {"hazards": mock_hazards, "total": len(mock_hazards)}
 
-@router.get("/analytics/dashboard")
-async def get_dashboard_analytics(db: Session = Depends(get_db)):
+def compute_dashboard_analytics(db: Session) -> dict:
     """
-    Calculates and returns key statistics for the dashboard.
+    Calculates key statistics for the dashboard.
     """
     # 1. Total Reports
     total_reports = db.query(HazardReport).count()
@@ -183,4 +396,32 @@ async def get_dashboard_analytics(db: Session = Depends(get_db)):
         "verified_reports": verified_reports,
         "avg_trust_score": avg_trust_score,
         "hazard_types": hazard_types
-    }
\ No newline at end of file
+    }
+
+@router.get("/analytics/dashboard")
+async def get_dashboard_analytics(db: Session = Depends(get_db)):
+    """
+    Returns key statistics for the dashboard, from cache while it is fresh.
+    Under load the last computed result is served instead of failing.
+    """
+    # Responses are built directly to skip FastAPI's jsonable_encoder pass
+    cached = _analytics_cache["data"]
+    if cached is not None and time.monotonic() - _analytics_cache["computed_at"] < ANALYTICS_CACHE_TTL:
+        return NegotiatedResponse(cached)
+
+    if not analytics_concurrency.try_acquire():
+        if cached is not None:
+            admission_stats.record_shed("analytics", "served_stale")
+            return NegotiatedResponse(cached, headers={"X-Cache": "stale"})
+        raise service_unavailable("analytics", "concurrency")
+
+    admission_stats.record_admitted("analytics")
+    try:
+        # Off the event loop so slow queries don't stall other requests
+        data = await run_in_threadpool(compute_dashboard_analytics, db)
+    finally:
+        analytics_concurrency.release()
+
+    _analytics_cache["data"] = data
+    _analytics_cache["computed_at"] = time.monotonic()
+    return NegotiatedResponse(data)
@@ -17,6 +17,10 @@ DEMO_MODE = True
 API_URL = "http://localhost:8000/api/hazards/report"
 BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN")
 
+# The API rate-limits report submissions (429) and sheds load (503); back off and retry
+MAX_SUBMIT_ATTEMPTS = 5
+DEFAULT_RETRY_AFTER_SECONDS = 10
+
 # Keywords to track when DEMO_MODE is False
 HAZARD_KEYWORDS = [
     "#chennaifloods", "#chennairains", "power cut", 
@@ -47,16 +51,32 @@ def process_tweet_text(tweet_text, is_demo=False):
         'report_source': source
     }
     
-    try:
-        # Send the data to your own API as form data
-        response = requests.post(API_URL, data=payload)
-        
-        #if response.status_code == [201,200]:
-        print(f"✅ Successfully submitted report from {source} to Synapse API., Body: {response.text}")
-        #else:
-            #print(f"❌ Failed to submit report. Status: {response.status_code}, Body: {response.text}")
-    except Exception as e:
-        print(f"❌ Error connecting to API: {e}")
+    submit_report(payload, source)
+
+
+def submit_report(payload, source):
+    """Posts a report, waiting out 429/503 responses as told by their Retry-After header."""
+    for attempt in range(1, MAX_SUBMIT_ATTEMPTS + 1):
+        try:
+            # Send the data to your own API as form data
+            response = requests.post(API_URL, data=payload)
+        except Exception as e:
+            print(f"❌ Error connecting to API: {e}")
+            return False
+
+        if response.status_code in (200, 201, 202):
+            print(f"✅ Successfully submitted report from {source} to Synapse API., Body: {response.text}")
+            return True
+        if response.status_code in (429, 503) and attempt < MAX_SUBMIT_ATTEMPTS:
+            try:
+                retry_after = int(response.headers.get("Retry-After", DEFAULT_RETRY_AFTER_SECONDS))
+            except ValueError:
+                retry_after = DEFAULT_RETRY_AFTER_SECONDS
+            print(f"⏳ API busy (status {response.status_code}), retrying in {retry_after}s...")
+            time.sleep(retry_after)
+            continue
+        print(f"❌ Failed to submit report. Status: {response.status_code}, Body: {response.text}")
+        return False
 
 # --- Main Execution Block ---
 
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Modules import each other as `app.*`, `models.*` and `routes.*` from the backend root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.database refuses to import without it; tests never open a connection
+os.environ.setdefault("DATABASE_URL", "sqlite://")
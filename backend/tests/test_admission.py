@@ -0,0 +1,183 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import admission
+from app.admission import (
+    AdmissionStats, ConcurrencyLimiter, RateLimitMiddleware, TokenBucketLimiter,
+    client_address, parse_trusted_proxies,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+
+def take(limiter, client="1.2.3.4"):
+    return asyncio.run(limiter.take(client))
+
+
+def test_concurrency_limiter():
+    limiter = ConcurrencyLimiter("report", 2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.in_flight == 1
+    assert limiter.try_acquire()
+
+
+def test_token_bucket_burst_then_refill(clock):
+    limiter = TokenBucketLimiter("t", rate=2, burst=3, redis_url=None)
+    assert [take(limiter)[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = take(limiter)
+    assert not allowed and retry_after == pytest.approx(0.5)
+    clock.now += 0.5  # one token back at 2 tokens/s
+    assert take(limiter) == (True, 0.0)
+    assert not take(limiter)[0]
+    clock.now += 60  # refill is capped at the burst size
+    assert [take(limiter)[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_token_bucket_is_per_client(clock):
+    limiter = TokenBucketLimiter("t", rate=1, burst=1, redis_url=None)
+    assert take(limiter, "a")[0]
+    assert not take(limiter, "a")[0]
+    assert take(limiter, "b")[0]
+
+
+def test_token_bucket_falls_back_when_redis_fails(clock):
+    limiter = TokenBucketLimiter("t", rate=1, burst=1, redis_url=None)
+
+    async def broken_script(**kwargs):
+        raise ConnectionError("redis down")
+
+    limiter._script = broken_script
+    assert take(limiter) == (True, 0.0)
+    assert not take(limiter)[0]
+
+
+def test_token_bucket_uses_redis_result(clock):
+    limiter = TokenBucketLimiter("t", rate=1, burst=1, redis_url=None)
+    calls = []
+
+    async def script(keys, args):
+        calls.append(keys)
+        return [0, b"2.5"]
+
+    limiter._script = script
+    assert take(limiter, "9.9.9.9") == (False, 2.5)
+    assert calls == [["ratelimit:t:9.9.9.9"]]
+
+
+def test_local_buckets_forget_refilled_clients(clock):
+    limiter = TokenBucketLimiter("t", rate=1, burst=1, redis_url=None)
+    for i in range(10_001):
+        take(limiter, str(i))
+    clock.now += 10
+    take(limiter, "new")
+    assert len(limiter._local) == 1
+
+
+@pytest.fixture
+def limited_app(monkeypatch):
+    stats = AdmissionStats()
+    monkeypatch.setattr(admission, "stats", stats)
+    received = []
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload():
+        received.append(True)
+        return {"ok": True}
+
+    @app.post("/open")
+    async def open_route():
+        return {"ok": True}
+
+    limiter = TokenBucketLimiter("upload", rate=0.01, burst=1, redis_url=None)
+    app.add_middleware(RateLimitMiddleware, limits={("POST", "/upload"): limiter})
+    return TestClient(app), received, stats
+
+
+def test_middleware_rejects_before_the_route_runs(limited_app):
+    client, received, stats = limited_app
+    assert client.post("/upload", content=b"x" * 1024).status_code == 200
+    r = client.post("/upload", content=b"x" * 1024)
+    assert r.status_code == 429
+    assert int(r.headers["retry-after"]) >= 1
+    assert received == [True]
+    assert stats.snapshot()["shed"] == {"upload": {"rate_limited": 1}}
+
+
+def test_middleware_ignores_other_routes(limited_app):
+    client, _, _ = limited_app
+    assert all(client.post("/open").status_code == 200 for _ in range(5))
+
+
+def test_middleware_does_not_read_rejected_body(clock):
+    limiter = TokenBucketLimiter("upload", rate=0.01, burst=0, redis_url=None)
+    inner_called = []
+
+    async def inner(scope, receive, send):
+        inner_called.append(True)
+
+    async def receive():
+        raise AssertionError("body must not be read")
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = RateLimitMiddleware(inner, {("POST", "/upload"): limiter})
+    scope = {"type": "http", "method": "POST", "path": "/upload", "client": ("1.2.3.4", 1), "headers": []}
+    asyncio.run(middleware(scope, receive, send))
+    assert not inner_called
+    assert sent[0]["status"] == 429
+
+
+def http_scope(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return {"type": "http", "client": (peer, 1234), "headers": headers}
+
+
+def test_forwarded_for_only_believed_from_trusted_proxies():
+    trusted = parse_trusted_proxies("172.28.0.10, 10.0.0.0/8")
+    # nginx appends the caller to whatever the caller claimed
+    assert client_address(http_scope("172.28.0.10", "6.6.6.6, 203.0.113.7"), trusted) == "203.0.113.7"
+    assert client_address(http_scope("172.28.0.10", "203.0.113.7, 10.1.2.3"), trusted) == "203.0.113.7"
+    assert client_address(http_scope("172.28.0.10"), trusted) == "172.28.0.10"
+    # A direct caller can't pick its own bucket
+    assert client_address(http_scope("198.51.100.1", "203.0.113.7"), trusted) == "198.51.100.1"
+    assert client_address(http_scope("172.28.0.10", "203.0.113.7"), []) == "172.28.0.10"
+
+
+def test_callers_behind_proxy_get_their_own_buckets(clock):
+    limiter = TokenBucketLimiter("upload", rate=0.01, burst=1, redis_url=None)
+    statuses = []
+
+    async def inner(scope, receive, send):
+        statuses.append(200)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    middleware = RateLimitMiddleware(inner, {("POST", "/upload"): limiter}, parse_trusted_proxies("172.28.0.10"))
+    for caller in ("203.0.113.7", "203.0.113.8", "203.0.113.7"):
+        scope = dict(http_scope("172.28.0.10", caller), method="POST", path="/upload")
+        asyncio.run(middleware(scope, None, send))
+    assert statuses == [200, 200, 429]
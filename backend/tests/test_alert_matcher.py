@@ -0,0 +1,97 @@
+import pytest
+from shapely.geometry import Polygon
+
+from app.alerts.alert_matcher import AlertMatcher, Subscription, haversine_meters
+
+
+def point(id, lat, lon, radius=1000, user_id=None, **kwargs):
+    return Subscription(id=id, user_id=user_id or id, latitude=lat, longitude=lon, radius_meters=radius, **kwargs)
+
+
+def matched_ids(matcher, lat, lon, hazard_type="flood", trust=1.0):
+    return sorted(s.id for s in matcher.match(lat, lon, hazard_type, trust))
+
+
+def test_haversine_known_distance():
+    # One degree of latitude is ~111 km
+    assert haversine_meters(0, 0, 1, 0) == pytest.approx(111_195, rel=1e-3)
+
+
+def test_point_radius_matches_inside_only():
+    matcher = AlertMatcher()
+    matcher.add(point(1, 13.05, 80.25, radius=1000))
+    assert matched_ids(matcher, 13.055, 80.25) == [1]   # ~550 m away
+    assert matched_ids(matcher, 13.07, 80.25) == []     # ~2.2 km away
+
+
+@pytest.mark.parametrize("lat, lon", [(-33.86, 151.2), (40.71, -74.0), (-22.9, -43.2), (0.0, 0.0)])
+def test_negative_and_zero_coordinates(lat, lon):
+    matcher = AlertMatcher()
+    matcher.add(point(1, lat, lon, radius=2000))
+    assert matched_ids(matcher, lat + 0.01, lon + 0.01) == [1]
+    assert matched_ids(matcher, lat - 0.01, lon - 0.01) == [1]
+    assert matched_ids(matcher, lat + 0.1, lon) == []
+
+
+def test_subscription_straddling_cell_boundary():
+    matcher = AlertMatcher(cell_size_deg=0.05)
+    # Centre sits just below a cell edge; the radius reaches into the next cell
+    matcher.add(point(1, 13.0499, 80.0499, radius=1000))
+    assert matcher._cell(13.0499, 80.0499) != matcher._cell(13.0501, 80.0501)
+    assert matched_ids(matcher, 13.0501, 80.0501) == [1]
+    assert matched_ids(matcher, 13.0499, 80.0499) == [1]
+
+
+def test_polygon_and_buffer():
+    square = Polygon([(80.2, 13.0), (80.3, 13.0), (80.3, 13.1), (80.2, 13.1)])
+    matcher = AlertMatcher()
+    matcher.add(Subscription(id=1, user_id=1, polygon=square))
+    matcher.add(Subscription(id=2, user_id=2, polygon=square, radius_meters=2000))
+    assert matched_ids(matcher, 13.05, 80.25) == [1, 2]
+    # ~1.1 km outside the east edge: only the buffered polygon covers it
+    assert matched_ids(matcher, 13.05, 80.31) == [2]
+    assert matched_ids(matcher, 13.05, 80.4) == []
+
+
+def test_hazard_type_and_trust_filters():
+    matcher = AlertMatcher()
+    matcher.add(point(1, 13.0, 80.0, hazard_types=frozenset({"flood"})))
+    matcher.add(point(2, 13.0, 80.0, min_trust_score=0.8))
+    assert matched_ids(matcher, 13.0, 80.0, "flood", 0.9) == [1, 2]
+    assert matched_ids(matcher, 13.0, 80.0, "fire", 0.9) == [2]
+    assert matched_ids(matcher, 13.0, 80.0, "flood", 0.5) == [1]
+
+
+def test_remove_and_replace_clean_up_cells():
+    matcher = AlertMatcher()
+    matcher.add(point(1, 13.0, 80.0))
+    matcher.add(point(1, 20.0, 75.0))  # same id replaces the old entry
+    assert matched_ids(matcher, 13.0, 80.0) == []
+    assert matched_ids(matcher, 20.0, 75.0) == [1]
+    matcher.remove(1)
+    assert len(matcher) == 0
+    assert matcher._cells == {}
+
+
+def test_oversized_subscriptions_are_rejected():
+    matcher = AlertMatcher(max_cells=100)
+    with pytest.raises(ValueError):
+        matcher.add(point(1, 13.0, 80.0, radius=2_000_000))
+    state = Polygon([(74.0, 8.0), (78.0, 8.0), (78.0, 13.0), (74.0, 13.0)])
+    with pytest.raises(ValueError):
+        matcher.add(Subscription(id=2, user_id=2, polygon=state))
+    assert len(matcher) == 0
+
+
+def test_rebuild_swaps_index_and_reports_skipped():
+    matcher = AlertMatcher(max_cells=100)
+    matcher.add(point(1, 13.0, 80.0))
+    skipped = matcher.rebuild([point(2, 20.0, 75.0), point(3, 13.0, 80.0, radius=2_000_000)])
+    assert skipped == [3]
+    assert matched_ids(matcher, 13.0, 80.0) == []
+    assert matched_ids(matcher, 20.0, 75.0) == [2]
+
+
+def test_subscription_requires_point_or_polygon():
+    with pytest.raises(ValueError):
+        Subscription(id=1, user_id=1)
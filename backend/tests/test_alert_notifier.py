@@ -0,0 +1,109 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.alerts.alert_matcher import Subscription
+from app.alerts import notifier
+from app.alerts.notifier import AlertDispatcher
+
+
+class RecordingSender:
+    def __init__(self):
+        self.batches = []
+
+    async def send_batch(self, notifications):
+        self.batches.append([n.user_id for n in notifications])
+
+
+def report(id):
+    return SimpleNamespace(id=id, title="Flooding", hazard_type="flood", trust_score=0.9, latitude=13.0, longitude=80.0)
+
+
+def subscriptions(*user_ids):
+    return [Subscription(id=i, user_id=u, latitude=13.0, longitude=80.0, radius_meters=500) for i, u in enumerate(user_ids)]
+
+
+def test_sends_in_batches():
+    sender = RecordingSender()
+    dispatcher = AlertDispatcher(sender, batch_size=2, min_interval_seconds=0)
+    sent = asyncio.run(dispatcher.dispatch(report(1), subscriptions(1, 2, 3, 4, 5)))
+    assert sent == 5
+    assert sender.batches == [[1, 2], [3, 4], [5]]
+
+
+def test_user_notified_once_per_report():
+    sender = RecordingSender()
+    dispatcher = AlertDispatcher(sender, min_interval_seconds=0)
+    # Two subscriptions of user 7 both match
+    assert asyncio.run(dispatcher.dispatch(report(1), subscriptions(7, 7, 8))) == 2
+    # The same report dispatched again (e.g. a retry) is deduplicated
+    assert asyncio.run(dispatcher.dispatch(report(1), subscriptions(7, 8))) == 0
+
+
+def test_rate_limit_per_user():
+    sender = RecordingSender()
+    dispatcher = AlertDispatcher(sender, min_interval_seconds=60)
+    assert asyncio.run(dispatcher.dispatch(report(1), subscriptions(7))) == 1
+    assert asyncio.run(dispatcher.dispatch(report(2), subscriptions(7, 8))) == 1
+    assert sender.batches == [[7], [8]]
+
+
+def test_dedup_memory_is_bounded():
+    dispatcher = AlertDispatcher(RecordingSender(), min_interval_seconds=0, dedup_capacity=3)
+    for report_id in range(10):
+        asyncio.run(dispatcher.dispatch(report(report_id), subscriptions(1)))
+    assert len(dispatcher.local_ledger._recent) == 3
+
+
+class FailingSender:
+    async def send_batch(self, notifications):
+        raise ConnectionError("push service down")
+
+
+def test_failed_send_does_not_mute_the_user():
+    dispatcher = AlertDispatcher(FailingSender(), min_interval_seconds=60)
+    assert asyncio.run(dispatcher.dispatch(report(1), subscriptions(7))) == 0
+    dispatcher.sender = RecordingSender()
+    assert asyncio.run(dispatcher.dispatch(report(1), subscriptions(7))) == 1
+
+
+def test_rate_limit_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(notifier.time, "monotonic", lambda: now[0])
+    dispatcher = AlertDispatcher(RecordingSender(), min_interval_seconds=60)
+    asyncio.run(dispatcher.dispatch(report(1), subscriptions(1, 2, 3)))
+    assert len(dispatcher.local_ledger._last_sent) == 3
+    now[0] += 61
+    assert asyncio.run(dispatcher.dispatch(report(2), subscriptions(4))) == 1
+    assert list(dispatcher.local_ledger._last_sent) == [4]
+
+
+def test_redis_ledger_is_shared_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis()
+    first = AlertDispatcher(RecordingSender(), min_interval_seconds=60, redis_getter=lambda: redis)
+    second = AlertDispatcher(RecordingSender(), min_interval_seconds=60, redis_getter=lambda: redis)
+
+    async def run():
+        assert await first.dispatch(report(1), subscriptions(7, 8)) == 2
+        # Another worker sees the same report and the same users' rate limits
+        assert await second.dispatch(report(1), subscriptions(7, 8, 9)) == 1
+        assert await second.dispatch(report(2), subscriptions(7)) == 0
+
+    asyncio.run(run())
+
+
+def test_falls_back_to_local_ledger_when_redis_fails():
+    class BrokenRedis:
+        def register_script(self, script):
+            async def run(**kwargs):
+                raise ConnectionError("redis down")
+            return run
+
+        def pipeline(self, transaction=False):
+            raise ConnectionError("redis down")
+
+    dispatcher = AlertDispatcher(RecordingSender(), min_interval_seconds=60, redis_getter=BrokenRedis)
+    assert asyncio.run(dispatcher.dispatch(report(1), subscriptions(7))) == 1
+    assert (7, 1) in dispatcher.local_ledger._recent
@@ -0,0 +1,76 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from routes import alerts
+
+
+class FakeSession:
+    def __init__(self):
+        self.added = []
+
+    def add(self, row):
+        self.added.append(row)
+
+    def commit(self):
+        pass
+
+    def refresh(self, row):
+        row.id = len(self.added)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    session = FakeSession()
+    app = FastAPI()
+    app.include_router(alerts.router)
+    app.dependency_overrides[get_db] = lambda: session
+    monkeypatch.setattr(alerts, "alert_matcher", alerts.alert_matcher.__class__())
+    client = TestClient(app)
+    client.session = session
+    return client
+
+
+SQUARE = [[80.2, 13.0], [80.3, 13.0], [80.3, 13.1], [80.2, 13.1]]
+
+
+def test_point_gets_default_radius(client):
+    r = client.post("/api/alerts/subscriptions", json={"user_id": 1, "latitude": 13.0, "longitude": 80.0})
+    assert r.status_code == 201
+    assert client.session.added[0].radius_meters == alerts.DEFAULT_POINT_RADIUS_METERS
+    assert len(alerts.alert_matcher) == 1
+
+
+def test_polygon_is_not_widened_by_default(client):
+    r = client.post("/api/alerts/subscriptions", json={"user_id": 1, "polygon": SQUARE})
+    assert r.status_code == 201
+    assert client.session.added[0].radius_meters == 0
+
+
+@pytest.mark.parametrize("payload", [
+    {"user_id": 1, "latitude": 91, "longitude": 80.0},
+    {"user_id": 1, "latitude": 13.0, "longitude": -181},
+    {"user_id": 1, "latitude": 13.0, "longitude": 80.0, "radius_meters": 2_000_000},
+    {"user_id": 1, "latitude": 13.0, "longitude": 80.0, "radius_meters": -1},
+])
+def test_out_of_range_values_are_rejected(client, payload):
+    assert client.post("/api/alerts/subscriptions", json=payload).status_code == 422
+    assert client.session.added == []
+
+
+def test_state_sized_polygon_is_rejected(client):
+    state = [[74.0, 8.0], [78.0, 8.0], [78.0, 13.0], [74.0, 13.0]]
+    r = client.post("/api/alerts/subscriptions", json={"user_id": 1, "polygon": state})
+    assert r.status_code == 400
+    assert client.session.added == []
+
+
+def test_missing_location_is_rejected(client):
+    assert client.post("/api/alerts/subscriptions", json={"user_id": 1}).status_code == 400
+
+
+def test_point_needs_a_radius(client):
+    r = client.post("/api/alerts/subscriptions", json={"user_id": 1, "latitude": 13.0, "longitude": 80.0, "radius_meters": 0})
+    assert r.status_code == 400
+    assert client.session.added == []
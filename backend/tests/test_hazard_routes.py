@@ -0,0 +1,223 @@
+import asyncio
+import importlib
+import sys
+import time
+import types
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from models.hazard import HazardReport
+
+
+class FakeSession:
+    """Records what the routes do with their session; never touches a database."""
+    def __init__(self):
+        self.added = []
+        self.committed = []
+        self.rolled_back = 0
+        self.on_commit = None
+
+    def add(self, row):
+        self.added.append(row)
+
+    def flush(self):
+        for i, row in enumerate(self.added, start=1):
+            row.id = row.id or i
+
+    def commit(self):
+        if self.on_commit:
+            self.on_commit()
+        self.committed.extend(self.added)
+
+    def refresh(self, row):
+        pass
+
+    def rollback(self):
+        self.rolled_back += 1
+        self.added = []
+
+    def close(self):
+        pass
+
+
+class BrokenRedis:
+    async def rpush(self, *args):
+        raise ConnectionError("redis down")
+
+    async def lrange(self, *args):
+        raise ConnectionError("redis down")
+
+    async def delete(self, *args):
+        raise ConnectionError("redis down")
+
+
+@pytest.fixture
+def hazards(monkeypatch):
+    # The real analysers load transformers and OpenCV models; score with stubs instead
+    import app.ai
+    text_analyser = types.ModuleType("app.ai.text_analyser")
+    text_analyser.analyze_report_text = lambda description: 0.8
+    image_analyser = types.ModuleType("app.ai.image_analyser")
+    image_analyser.analyze_report_image = lambda content: 0.4
+    for name, module in (("text_analyser", text_analyser), ("image_analyser", image_analyser)):
+        monkeypatch.setitem(sys.modules, f"app.ai.{name}", module)
+        monkeypatch.setattr(app.ai, name, module, raising=False)
+    monkeypatch.delitem(sys.modules, "routes.hazards", raising=False)
+    module = importlib.import_module("routes.hazards")
+    monkeypatch.setattr(module, "get_redis", lambda: None)
+    monkeypatch.setattr(module, "_local_pending_images", {})
+    monkeypatch.setattr(module, "_count_pending_reports", lambda db: 0)
+    return module
+
+
+@pytest.fixture
+def client(hazards):
+    session = FakeSession()
+    app = FastAPI()
+    app.include_router(hazards.router)
+    app.dependency_overrides[get_db] = lambda: session
+    client = TestClient(app)
+    client.session = session
+    return client
+
+
+REPORT = {
+    "title": "Flooded underpass",
+    "description": "Water is knee deep under the railway bridge near the station",
+    "hazard_type": "flood",
+    "latitude": "13.08",
+    "longitude": "80.27",
+}
+
+
+def post_report(client, images=()):
+    files = [("images", (f"{i}.jpg", content, "image/jpeg")) for i, content in enumerate(images)]
+    return client.post("/api/hazards/report", data=REPORT, files=files or None)
+
+
+def saturate(monkeypatch, limiter):
+    monkeypatch.setattr(limiter, "in_flight", limiter.limit)
+
+
+def test_report_deferred_when_scoring_is_saturated(hazards, client, monkeypatch):
+    saturate(monkeypatch, hazards.report_concurrency)
+    # Images must be in place by the time the row becomes visible to workers
+    images_at_commit = []
+    client.session.on_commit = lambda: images_at_commit.append(dict(hazards._local_pending_images))
+
+    r = post_report(client, [b"img"])
+    assert r.status_code == 202
+    body = r.json()
+    assert body["scoring_status"] == "pending"
+    report = client.session.committed[0]
+    assert report.id == body["report_id"] and report.trust_score is None
+    assert images_at_commit == [{report.id: [b"img"]}]
+    assert hazards.report_pending_inserts.in_flight == 0
+
+
+def test_deferred_report_rejected_when_backlog_is_full(hazards, client, monkeypatch):
+    saturate(monkeypatch, hazards.report_concurrency)
+    monkeypatch.setattr(hazards, "_count_pending_reports", lambda db: hazards.REPORT_PENDING_MAX)
+    r = post_report(client)
+    assert r.status_code == 503
+    assert r.headers["retry-after"]
+    assert client.session.committed == []
+    assert hazards.report_pending_inserts.in_flight == 0
+
+
+def test_deferred_report_rejected_when_inserts_are_saturated(hazards, client, monkeypatch):
+    saturate(monkeypatch, hazards.report_concurrency)
+    saturate(monkeypatch, hazards.report_pending_inserts)
+    assert post_report(client).status_code == 503
+    assert client.session.added == []
+
+
+def test_report_not_committed_when_images_cannot_be_stored(hazards, client, monkeypatch):
+    saturate(monkeypatch, hazards.report_concurrency)
+    monkeypatch.setattr(hazards, "get_redis", BrokenRedis)
+    r = post_report(client, [b"img"])
+    assert r.status_code == 503
+    assert client.session.committed == []
+    assert client.session.rolled_back
+    assert hazards._local_pending_images == {}
+
+
+def pending_report(id=7):
+    return HazardReport(
+        id=id, title="Tree fall", description="A large tree is blocking both lanes of the road",
+        hazard_type="infrastructure", latitude=13.0, longitude=80.2, is_verified=False,
+        scoring_status="pending",
+    )
+
+
+@pytest.fixture
+def worker(hazards, monkeypatch):
+    session = FakeSession()
+    report = pending_report()
+    broadcasts = []
+
+    async def broadcast(payload):
+        broadcasts.append(payload)
+
+    monkeypatch.setattr(hazards, "SessionLocal", lambda: session)
+    monkeypatch.setattr(hazards, "_claim_pending_report", lambda db: report)
+    monkeypatch.setattr(hazards.websocket_manager, "broadcast_json", broadcast)
+    hazards._local_pending_images[report.id] = [b"img"]
+    return types.SimpleNamespace(session=session, report=report, broadcasts=broadcasts)
+
+
+def test_worker_scores_pending_report(hazards, worker):
+    assert asyncio.run(hazards.score_next_pending_report()) == worker.report.id
+    assert worker.report.scoring_status == "scored"
+    assert worker.report.trust_score == hazards.calculate_final_trust_score(0.8, 0.4)
+    assert hazards._local_pending_images == {}
+    assert [b["id"] for b in worker.broadcasts] == [worker.report.id]
+
+
+def test_worker_marks_unscorable_report_failed(hazards, worker, monkeypatch):
+    def explode(description):
+        raise RuntimeError("model error")
+
+    monkeypatch.setattr(hazards.text_analyser, "analyze_report_text", explode)
+    assert asyncio.run(hazards.score_next_pending_report()) == worker.report.id
+    assert worker.report.scoring_status == "failed"
+    assert hazards._local_pending_images == {}
+    assert worker.broadcasts == []
+
+
+def test_worker_leaves_report_pending_when_redis_fails(hazards, worker, monkeypatch):
+    monkeypatch.setattr(hazards, "get_redis", BrokenRedis)
+    assert asyncio.run(hazards.score_next_pending_report()) is None
+    assert worker.report.scoring_status == "pending"
+    assert worker.session.rolled_back
+    assert worker.broadcasts == []
+
+
+def test_worker_idle_without_pending_reports(hazards, worker, monkeypatch):
+    monkeypatch.setattr(hazards, "_claim_pending_report", lambda db: None)
+    assert asyncio.run(hazards.score_next_pending_report()) is None
+
+
+def test_analytics_served_stale_when_saturated(hazards, client, monkeypatch):
+    saturate(monkeypatch, hazards.analytics_concurrency)
+    monkeypatch.setattr(hazards, "_analytics_cache", {"data": {"total_reports": 3}, "computed_at": 0.0})
+    r = client.get("/api/hazards/analytics/dashboard")
+    assert r.status_code == 200
+    assert r.headers["x-cache"] == "stale"
+    assert r.json() == {"total_reports": 3}
+
+
+def test_analytics_503_when_saturated_without_cache(hazards, client, monkeypatch):
+    saturate(monkeypatch, hazards.analytics_concurrency)
+    monkeypatch.setattr(hazards, "_analytics_cache", {"data": None, "computed_at": 0.0})
+    r = client.get("/api/hazards/analytics/dashboard")
+    assert r.status_code == 503
+    assert r.headers["retry-after"]
+
+
+def test_analytics_served_from_fresh_cache(hazards, client, monkeypatch):
+    monkeypatch.setattr(hazards, "_analytics_cache", {"data": {"total_reports": 5}, "computed_at": time.monotonic()})
+    assert client.get("/api/hazards/analytics/dashboard").json() == {"total_reports": 5}
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import msgpack
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.serialization import (
+    ContentNegotiationMiddleware, NegotiatedResponse, dumps_json, dumps_msgpack, wants_msgpack,
+)
+from app.schemas import HazardReportResponse, hazard_report_payload
+from app.websocket_handler import ConnectionManager
+from models.hazard import HazardReport
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/msgpack", True),
+    ("application/x-msgpack", True),
+    ("Application/MsgPack", True),
+    ("application/msgpack, */*", True),
+    ("application/json;q=0.5, application/msgpack", True),
+    ("application/msgpack, application/json", True),
+    (None, False),
+    ("", False),
+    ("application/json", False),
+    ("*/*", False),
+    ("application/*", False),
+    ("application/json, application/msgpack;q=0", False),
+    ("application/msgpack;q=0.5, application/json", False),
+    ("application/*;q=0.1, application/msgpack;q=0", False),
+    ("application/msgpack;q=bogus", False),
+])
+def test_accept_negotiation(accept, expected):
+    assert wants_msgpack(accept) is expected
+
+
+def test_datetimes_and_unknown_types():
+    when = datetime(2025, 1, 1, 12, 30, tzinfo=timezone.utc)
+    assert orjson.loads(dumps_json({"t": when, "d": Decimal("0.75")})) == {
+        "t": "2025-01-01T12:30:00+00:00", "d": "0.75",
+    }
+    assert msgpack.unpackb(dumps_msgpack({"t": when})) == {"t": "2025-01-01T12:30:00+00:00"}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI(default_response_class=NegotiatedResponse)
+    app.add_middleware(ContentNegotiationMiddleware)
+
+    @app.get("/data")
+    async def data():
+        return {"hazard_types": {"flood": 3}}
+
+    return TestClient(app)
+
+
+def test_rest_defaults_to_json(client):
+    r = client.get("/data")
+    assert r.headers["content-type"] == "application/json"
+    assert r.headers["vary"] == "Accept"
+    assert r.json() == {"hazard_types": {"flood": 3}}
+
+
+def test_rest_msgpack_when_asked(client):
+    r = client.get("/data", headers={"Accept": "application/msgpack"})
+    assert r.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(r.content) == {"hazard_types": {"flood": 3}}
+
+
+def test_rest_respects_q_zero(client):
+    r = client.get("/data", headers={"Accept": "application/json, application/msgpack;q=0"})
+    assert r.headers["content-type"] == "application/json"
+
+
+class FakeWebSocket:
+    def __init__(self, headers=None, query_params=None):
+        self.headers = headers or {}
+        self.query_params = query_params or {}
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(("text", text))
+
+    async def send_bytes(self, data):
+        self.sent.append(("bytes", data))
+
+
+def test_websocket_broadcast_per_negotiated_encoding():
+    manager = ConnectionManager()
+    plain = FakeWebSocket()
+    by_header = FakeWebSocket(headers={"accept": "application/msgpack"})
+    by_query = FakeWebSocket(query_params={"encoding": "msgpack"})
+    payload = {"id": 1, "timestamp": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+
+    async def run():
+        for ws in (plain, by_header, by_query):
+            await manager.connect(ws)
+        await manager.broadcast_json(payload)
+        manager.disconnect(by_query)
+
+    asyncio.run(run())
+    assert plain.sent == [("text", '{"id":1,"timestamp":"2025-01-01T00:00:00+00:00"}')]
+    for ws in (by_header, by_query):
+        kind, data = ws.sent[0]
+        assert kind == "bytes"
+        assert msgpack.unpackb(data) == {"id": 1, "timestamp": "2025-01-01T00:00:00+00:00"}
+    assert len(manager.active_connections) == 2
+
+
+def test_report_payload_is_lean():
+    when = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    report = HazardReport(
+        id=3, title="Flooding", hazard_type="flood", latitude=13.0, longitude=80.2,
+        is_verified=False, scoring_status="scored", timestamp=when, created_at=when,
+    )
+    payload = hazard_report_payload(report)
+    assert set(payload) == set(HazardReportResponse.model_fields)
+    assert "location" not in payload and "created_at" not in payload
+    assert HazardReportResponse(**payload).timestamp == when
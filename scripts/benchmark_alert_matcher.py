@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the geofenced alert matcher: match reports against 1M subscriptions
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from app.alerts.alert_matcher import AlertMatcher, Subscription
+
+# Subscribers spread over the whole of India
+INDIA_BOUNDS = {
+    "lat_min": 8.0,
+    "lat_max": 32.0,
+    "lon_min": 68.0,
+    "lon_max": 97.0
+}
+
+HAZARD_TYPES = ["flood", "infrastructure", "fire", "cyclone", "landslide"]
+SUBSCRIPTIONS = 1_000_000
+REPORTS = 1_000
+
+
+def random_point():
+    return (
+        random.uniform(INDIA_BOUNDS["lat_min"], INDIA_BOUNDS["lat_max"]),
+        random.uniform(INDIA_BOUNDS["lon_min"], INDIA_BOUNDS["lon_max"]),
+    )
+
+
+def main():
+    random.seed(42)
+    matcher = AlertMatcher()
+
+    print(f"Indexing {SUBSCRIPTIONS:,} subscriptions...")
+    start = time.perf_counter()
+    for i in range(SUBSCRIPTIONS):
+        lat, lon = random_point()
+        matcher.add(Subscription(
+            id=i,
+            user_id=i,
+            latitude=lat,
+            longitude=lon,
+            radius_meters=random.choice([1000, 2000, 5000]),
+            hazard_types=frozenset(random.sample(HAZARD_TYPES, 2)),
+            min_trust_score=random.uniform(0.3, 0.8),
+        ))
+    print(f"  built in {time.perf_counter() - start:.1f}s")
+
+    reports = [(*random_point(), random.choice(HAZARD_TYPES), random.uniform(0.3, 1.0)) for _ in range(REPORTS)]
+    matched = 0
+    start = time.perf_counter()
+    for lat, lon, hazard_type, trust in reports:
+        matched += len(matcher.match(lat, lon, hazard_type, trust))
+    elapsed = time.perf_counter() - start
+    print(f"Indexed match: {elapsed / REPORTS * 1000:.3f} ms/report ({matched} matches)")
+
+    # Linear scan baseline over a sample of the reports
+    subscriptions = list(matcher._subscriptions.values())
+    sample = reports[:5]
+    start = time.perf_counter()
+    for lat, lon, hazard_type, trust in sample:
+        [s for s in subscriptions if s.accepts(hazard_type, trust) and s.covers(lat, lon)]
+    elapsed = time.perf_counter() - start
+    print(f"Linear scan:   {elapsed / len(sample) * 1000:.3f} ms/report")
+
+
+if __name__ == "__main__":
+    main()
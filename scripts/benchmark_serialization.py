@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark for report serialization: the old json.dumps path vs orjson / MessagePack
+
+The REST numbers only apply to routes that return NegotiatedResponse themselves
+(GET /api/hazards/report/{id}, analytics). Routes returning plain dicts still
+pay FastAPI's jsonable_encoder pass before the response class runs.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")  # app.database refuses to import without it
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from geoalchemy2.shape import from_shape
+from shapely.geometry import Point
+
+from app import serialization
+from app.schemas import hazard_report_payload
+from models.hazard import HazardReport
+
+REPORTS = 1_000
+ROUNDS = 20
+
+
+def make_reports():
+    random.seed(42)
+    now = datetime.now(timezone.utc)
+    reports = []
+    for i in range(REPORTS):
+        lat, lon = random.uniform(12.8, 13.3), random.uniform(80.0, 80.5)
+        created = now - timedelta(minutes=random.randint(0, 10_000))
+        reports.append(HazardReport(
+            id=i,
+            title=f"Heavy flooding near ward {i}",
+            description="Water level is approximately 2 feet high due to heavy rainfall.",
+            hazard_type=random.choice(["flood", "infrastructure", "fire"]),
+            severity_score=random.random(),
+            trust_score=random.random(),
+            report_source="citizen_app",
+            location=from_shape(Point(lon, lat), srid=4326),
+            latitude=lat,
+            longitude=lon,
+            address="Marina Beach Road, Chennai",
+            is_verified=False,
+            scoring_status="scored",
+            created_at=created,
+            updated_at=created,
+            timestamp=created,
+        ))
+    return reports
+
+
+def bench(label, fn, reports, baseline=None):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        size = len(fn(reports))
+    elapsed = (time.perf_counter() - start) / ROUNDS * 1000
+    speedup = f"  ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"{label:<46} {elapsed:8.2f} ms  {size / 1024:8.1f} KiB{speedup}")
+    return elapsed
+
+
+def legacy_broadcast(reports):
+    # What broadcast_json used to do for every report
+    return "".join(
+        json.dumps({c.name: getattr(r, c.name) for c in r.__table__.columns}, default=str)
+        for r in reports
+    )
+
+
+def orjson_broadcast(reports):
+    return b"".join(serialization.dumps_json(hazard_report_payload(r)) for r in reports)
+
+
+def msgpack_broadcast(reports):
+    return b"".join(serialization.dumps_msgpack(hazard_report_payload(r)) for r in reports)
+
+
+def legacy_rest(reports):
+    # Default FastAPI path for a returned dict: jsonable_encoder + JSONResponse
+    # (the WKB column can't go through it at all, so both sides use the lean fields)
+    return b"".join(JSONResponse(jsonable_encoder(hazard_report_payload(r))).body for r in reports)
+
+
+def lean_rest(encoding):
+    # What GET /api/hazards/report/{id} does: NegotiatedResponse built directly
+    def render(reports):
+        token = serialization._response_encoding.set(encoding)
+        try:
+            return b"".join(serialization.NegotiatedResponse(hazard_report_payload(r)).body for r in reports)
+        finally:
+            serialization._response_encoding.reset(token)
+    return render
+
+
+def main():
+    reports = make_reports()
+    print(f"Serializing {REPORTS:,} reports, {ROUNDS} rounds\n")
+
+    print("WebSocket broadcast (one message per report)")
+    baseline = bench("json.dumps, all columns (previous)", legacy_broadcast, reports)
+    bench("orjson, lean payload", orjson_broadcast, reports, baseline)
+    if serialization.MSGPACK_AVAILABLE:
+        bench("msgpack, lean payload", msgpack_broadcast, reports, baseline)
+
+    print("\nREST report lookup (one response per report, GET /api/hazards/report/{id})")
+    baseline = bench("jsonable_encoder + JSONResponse (dict return)", legacy_rest, reports)
+    bench("NegotiatedResponse, orjson", lean_rest("json"), reports, baseline)
+    if serialization.MSGPACK_AVAILABLE:
+        bench("NegotiatedResponse, msgpack", lean_rest("msgpack"), reports, baseline)
+
+
+if __name__ == "__main__":
+    main()